@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# bot.py при импорте открывает SQLite в BOT_DATA_DIR — тестам нужен свой каталог
+os.environ["BOT_DATA_DIR"] = tempfile.mkdtemp(prefix="bot-test-")
+os.environ.setdefault("BOT_LOG_LEVEL", "WARNING")
+os.environ.pop("BOT_RECORD", None)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
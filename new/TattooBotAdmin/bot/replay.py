@@ -0,0 +1,234 @@
+"""Replay traffic recorded with BOT_RECORD through the real handlers, offline.
+
+    python replay.py traffic.jsonl.gz [--speed max|1] [--api-latency 0.0]
+
+Telegram is replaced by a stub Request that answers every method locally, the
+admin API by the recorded responses (the latest one recorded before each
+update). The report shows latency per handler callback.
+"""
+import argparse
+import bisect
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from queue import Queue
+
+# бот не должен трогать реальное состояние и писать новую запись
+os.environ["BOT_DATA_DIR"] = tempfile.mkdtemp(prefix="bot-replay-")
+os.environ.pop("BOT_RECORD", None)
+
+import bot as app  # noqa: E402
+from telegram import Bot, Update  # noqa: E402
+from telegram.ext import ConversationHandler, Dispatcher, JobQueue  # noqa: E402
+
+PNG_1PX = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89"
+    b"\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+def read_log(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class RecordedApi:
+    """Serves admin API responses as they were at a given point of the recording."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.now = 0.0
+        self.calls = Counter()
+        self._index = defaultdict(list)
+
+    @staticmethod
+    def _key(method, path, params):
+        return method, path, json.dumps(params or None, sort_keys=True)
+
+    def add(self, rec):
+        self._index[self._key(rec["k"], rec["p"], rec.get("q"))].append((rec["t"], rec["d"]))
+
+    def _serve(self, method, path, params):
+        self.calls[f"{method.upper()} {path}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        items = self._index.get(self._key(method, path, params))
+        if not items:
+            return {}
+        i = bisect.bisect_right([t for t, _ in items], self.now) - 1
+        return items[max(i, 0)][1]
+
+    def get(self, path, params=None):
+        return self._serve("get", path, params)
+
+    def post(self, path, payload, headers=None):
+        return self._serve("post", path, None)
+
+
+class StubRequest:
+    """Stand-in for telegram.utils.request.Request that never leaves the process."""
+
+    con_pool_size = 64
+
+    def __init__(self):
+        self.calls = Counter()
+        self._message_id = 0
+
+    def _message(self, data):
+        self._message_id += 1
+        chat_id = data.get("chat_id") or 1
+        msg = {
+            "message_id": data.get("message_id") or self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+        }
+        if "photo" in data or "media" in data:
+            msg["photo"] = [{"file_id": f"replay-{self._message_id}", "file_unique_id": f"u{self._message_id}",
+                             "width": 1, "height": 1}]
+            msg["caption"] = data.get("caption")
+        else:
+            msg["text"] = data.get("text") or ""
+        return msg
+
+    def post(self, url, data=None, timeout=None):
+        method = url.rsplit("/", 1)[-1]
+        self.calls[method] += 1
+        data = data or {}
+        if method == "getMe":
+            return {"id": 123456, "is_bot": True, "first_name": "replay", "username": "replay_bot"}
+        if method == "sendMediaGroup":
+            return [self._message({"chat_id": data.get("chat_id"), "photo": True}) for _ in data.get("media", [])]
+        if method.startswith("send") or method.startswith("edit"):
+            return self._message(data)
+        return True
+
+    def retrieve(self, url, timeout=None):
+        return PNG_1PX
+
+    def stop(self):
+        pass
+
+
+class _StubResponse:
+    status_code = 200
+    headers = {"Content-Type": "image/png"}
+    content = PNG_1PX
+    ok = True
+
+    def raise_for_status(self):
+        pass
+
+
+class HandlerStats:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+
+    def wrap(self, callback):
+        name = getattr(callback, "__name__", repr(callback))
+
+        def timed(update, ctx):
+            started = time.perf_counter()
+            try:
+                return callback(update, ctx)
+            except Exception:
+                self.errors[name] += 1
+                raise
+            finally:
+                self.samples[name].append(time.perf_counter() - started)
+
+        timed.__name__ = name
+        return timed
+
+    def instrument(self, dp):
+        for handlers in dp.handlers.values():
+            for h in handlers:
+                if isinstance(h, ConversationHandler):
+                    inner = list(h.entry_points) + list(h.fallbacks)
+                    for state_handlers in h.states.values():
+                        inner.extend(state_handlers)
+                    for ih in inner:
+                        ih.callback = self.wrap(ih.callback)
+                else:
+                    h.callback = self.wrap(h.callback)
+
+    def report(self, out=sys.stdout):
+        def pct(xs, p):
+            return xs[min(len(xs) - 1, int(len(xs) * p))] * 1000
+
+        rows = sorted(self.samples.items(), key=lambda kv: -sum(kv[1]))
+        out.write(f"{'handler':<22}{'calls':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'total s':>10}\n")
+        for name, xs in rows:
+            xs = sorted(xs)
+            out.write(f"{name:<22}{len(xs):>7}{self.errors[name]:>5}{pct(xs, .5):>10.1f}{pct(xs, .95):>10.1f}"
+                      f"{xs[-1] * 1000:>10.1f}{sum(xs):>10.2f}\n")
+
+
+def build_dispatcher(request):
+    bot = Bot("123456:replay", request=request)
+    job_queue = JobQueue()
+    dp = Dispatcher(bot, Queue(), job_queue=job_queue, workers=1)
+    job_queue.set_dispatcher(dp)
+    app.setup_dispatcher(dp)
+    app.ACTIVE_BOTS[app.bot_key(bot)] = bot
+    return dp
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("log", help="file written with BOT_RECORD (.jsonl or .jsonl.gz)")
+    ap.add_argument("--speed", choices=["max", "1"], default="max", help="max — без пауз, 1 — в реальном темпе")
+    ap.add_argument("--api-latency", type=float, default=0.0, help="искусственная задержка ответа API, сек")
+    args = ap.parse_args(argv)
+
+    api = RecordedApi(args.api_latency)
+    updates = []
+    for rec in read_log(args.log):
+        if rec["k"] == "u":
+            updates.append(rec)
+        else:
+            api.add(rec)
+
+    app._api_get = api.get
+    app.api_post = api.post
+    app.requests.get = app.requests.head = lambda *a, **kw: _StubResponse()
+
+    request = StubRequest()
+    dp = build_dispatcher(request)
+    stats = HandlerStats()
+    stats.instrument(dp)
+
+    per_update = []
+    wall = time.perf_counter()
+    t0 = updates[0]["t"] if updates else 0.0
+    for rec in updates:
+        if args.speed == "1":
+            delay = (rec["t"] - t0) - (time.perf_counter() - wall)
+            if delay > 0:
+                time.sleep(delay)
+        api.now = rec["t"]
+        update = Update.de_json(rec["d"], dp.bot)
+        started = time.perf_counter()
+        dp.process_update(update)
+        per_update.append(time.perf_counter() - started)
+    wall = time.perf_counter() - wall
+
+    stats.report()
+    if per_update:
+        per_update.sort()
+        print(f"\nupdates: {len(per_update)}  wall: {wall:.2f}s  "
+              f"p50: {per_update[len(per_update) // 2] * 1000:.1f}ms  max: {per_update[-1] * 1000:.1f}ms")
+    print("telegram calls:", dict(request.calls.most_common()))
+    print("api calls:", dict(api.calls.most_common()))
+
+
+if __name__ == "__main__":
+    main()
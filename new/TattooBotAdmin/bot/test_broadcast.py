@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+import bot as app
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append(chat_id)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return app.BroadcastEngine(str(tmp_path / "broadcast.sqlite"), rate=1000)
+
+
+def test_broadcast_of_missing_bot_does_not_block_others(engine, monkeypatch):
+    new = FakeBot()
+    monkeypatch.setitem(app.ACTIVE_BOTS, "new", new)
+    old_id = engine.create("old", "до ротации", None, [1, 2])   # бот с этим ключом уже не вернётся
+    new_id = engine.create("new", "после ротации", None, [3, 4])
+    stop = threading.Event()
+
+    assert engine.run_pending(stop) == 1
+    assert sorted(new.sent) == [3, 4]
+    assert engine.progress(new_id)["status"] == "done"
+    assert engine.progress(old_id)["status"] == "running"
+
+    monkeypatch.setattr(app, "BROADCAST_ORPHAN_TIMEOUT", 0)
+    assert engine.run_pending(stop) == 0
+    p = engine.progress(old_id)
+    assert p["status"] == "abandoned" and p["pending"] == 2
+
+
+def test_broadcast_resumes_when_bot_comes_back(engine, monkeypatch):
+    bid = engine.create("late", "привет", None, [1, 2, 3])
+    stop = threading.Event()
+    assert engine.run_pending(stop) == 1
+
+    late = FakeBot()
+    monkeypatch.setitem(app.ACTIVE_BOTS, "late", late)
+    assert engine.run_pending(stop) == 0
+    assert sorted(late.sent) == [1, 2, 3]
+    assert engine.progress(bid) == {"id": bid, "status": "done", "sent": 3}
+
+
+def test_stop_is_not_reported_as_missing_bot(engine, monkeypatch):
+    stop = threading.Event()
+
+    class StoppingBot(FakeBot):
+        def send_message(self, chat_id, text, **kwargs):
+            super().send_message(chat_id, text, **kwargs)
+            stop.set()
+
+    bot = StoppingBot()
+    monkeypatch.setitem(app.ACTIVE_BOTS, "b", bot)
+    bid = engine.create("b", "привет", None, [1, 2, 3])
+    assert engine._run(stop, bid, "b", "привет", None) is True
+    assert engine.progress(bid)["status"] == "running" and len(bot.sent) == 1
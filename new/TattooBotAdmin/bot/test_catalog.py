@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+import bot as app
+
+SERVICE = {"id": "s1", "name": "Тату", "duration": 60, "price": 5000}
+MASTER = {"id": "m1", "name": "Маша", "nickname": "", "telegram": "", "specialization": "",
+          "avatar": "", "teletypeUrl": "", "isActive": True}
+WORK = {"id": "w1", "url": "/uploads/w1.jpg", "title": "", "mediaType": "image",
+        "masterId": "m1", "style": "Графика", "thumbnail": None}
+
+
+def install(monkeypatch, services, masters, works):
+    monkeypatch.setattr(app, "safe_get_services", lambda on_error=(): services if services is not None else on_error)
+    monkeypatch.setattr(app, "safe_get_masters", lambda on_error=(): masters if masters is not None else on_error)
+    monkeypatch.setattr(app, "safe_get_portfolio", lambda on_error=(): works if works is not None else on_error)
+
+
+def test_failed_section_keeps_previous_data(monkeypatch):
+    monkeypatch.setattr(app.DEFAULT_STUDIO, "catalog", app.Catalog())
+    install(monkeypatch, [SERVICE], [MASTER], [WORK])
+    good = app.refresh_catalog()
+    assert good.ts > 0 and good.master_styles("m1") == ("Графика",)
+
+    install(monkeypatch, [SERVICE], [MASTER], None)  # /api/portfolio упал
+    cat = app.refresh_catalog()
+    assert cat.master_styles("m1") == ("Графика",)
+    # следующая попытка — через CATALOG_RETRY, а не через полный CATALOG_TTL
+    assert cat.ts + app.CATALOG_TTL - time.time() == pytest.approx(app.CATALOG_RETRY, abs=1)
+
+
+def test_cold_start_with_api_down_retries_shortly(monkeypatch):
+    monkeypatch.setattr(app.DEFAULT_STUDIO, "catalog", app.Catalog())
+    calls = counting(monkeypatch, False)
+    assert app.get_catalog().services == ()
+    assert app.get_catalog().services == () and len(calls) == 3  # второй вызов API не трогает
+
+    app.DEFAULT_STUDIO.catalog.ts -= app.CATALOG_RETRY  # пауза до повтора прошла
+    counting(monkeypatch, True)
+    app.get_catalog()  # отдаёт пустой снимок и запускает фоновое обновление
+    wait_refresh()
+    assert [s.id for s in app.get_catalog().services] == ["s1"]
+
+
+def test_stale_snapshot_is_served_while_one_thread_refreshes(monkeypatch):
+    install(monkeypatch, [SERVICE], [MASTER], [WORK])
+    monkeypatch.setattr(app.DEFAULT_STUDIO, "catalog", app.Catalog())
+    stale = app.refresh_catalog()
+    monkeypatch.setattr(app.DEFAULT_STUDIO, "catalog", app.Catalog(stale.services, stale.masters, stale.works, ts=1.0))
+
+    calls = counting(monkeypatch, False, delay=0.5)  # API лежит и отвечает медленно
+    started = time.monotonic()
+    threads = [threading.Thread(target=app.get_catalog) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - started < 0.3
+    assert app.get_catalog().services == stale.services
+    wait_refresh()
+    assert len(calls) == 3  # одно обновление на всех, а не по одному на поток
+
+
+def test_empty_answer_is_not_a_failure(monkeypatch):
+    monkeypatch.setattr(app.DEFAULT_STUDIO, "catalog", app.Catalog())
+    install(monkeypatch, [SERVICE], [MASTER], [WORK])
+    app.refresh_catalog()
+    install(monkeypatch, [SERVICE], [MASTER], [])  # админ удалил все работы
+    cat = app.refresh_catalog()
+    assert cat.works == () and cat.ts > 0
+
+
+def counting(monkeypatch, up, delay=0.0):
+    """All three fetches succeed (up) or fail; returns the list of upstream calls."""
+    calls = []
+
+    def fetcher(items):
+        def fetch(on_error=()):
+            calls.append(1)
+            time.sleep(delay)
+            return items if up else on_error
+        return fetch
+
+    for name, items in (("safe_get_services", [SERVICE]), ("safe_get_masters", [MASTER]),
+                        ("safe_get_portfolio", [WORK])):
+        monkeypatch.setattr(app, name, fetcher(items))
+    return calls
+
+
+def wait_refresh():
+    with app.DEFAULT_STUDIO.catalog_refresh:
+        pass
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import bot as app
+
+
+def tap(uid, data):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=uid), callback_query=SimpleNamespace(data=data))
+
+
+def message(uid, text):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=uid), callback_query=None,
+                           message=SimpleNamespace(text=text))
+
+
+def test_duplicate_tap_is_dropped_until_released():
+    gate = app.InboundGate(rate=100, burst=100)
+    reason, key = gate.admit(tap(1, "about"))
+    assert reason is None
+    assert gate.admit(tap(1, "about")) == ("duplicate", None)
+    gate.release(key)
+    assert gate.admit(tap(1, "about"))[0] is None
+
+
+def test_taps_are_throttled_but_typed_messages_are_not():
+    gate = app.InboundGate(rate=0.001, burst=3)
+    reasons = [gate.admit(tap(1, f"b{i}"))[0] for i in range(5)]
+    assert reasons == [None, None, None, "throttled", "throttled"]
+    # сразу после серии нажатий пользователь вводит телефон — он должен дойти
+    assert gate.admit(message(1, "+79161234567")) == (None, None)
+    assert gate.admit(message(1, "12")) == (None, None)
+    assert gate.admit(tap(2, "b0"))[0] is None  # у других пользователей своя корзина
@@ -0,0 +1,66 @@
+import requests
+
+import bot as app
+
+
+def pending(batcher):
+    return batcher._db.execute("SELECT booking_id, chat_id, kinds FROM notify_pending ORDER BY rowid").fetchall()
+
+
+def test_registrations_survive_a_restart(tmp_path, monkeypatch):
+    path = str(tmp_path / "notify.sqlite")
+    app.NotifyBatcher(path, 5).register("b1", 7, "confirm")  # бот упал до flush
+
+    posted = []
+    monkeypatch.setattr(app, "api_post", lambda p, payload, headers=None: posted.append(payload["events"]))
+    batcher = app.NotifyBatcher(path, 5)
+    assert batcher.flush()
+    assert posted == [[{"bookingId": "b1", "chatId": 7, "type": "confirm"}]]
+    assert pending(batcher) == []
+
+
+def test_unreachable_api_keeps_and_merges_entries(tmp_path, monkeypatch):
+    def down(*a, **kw):
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(app, "api_post", down)
+    batcher = app.NotifyBatcher(str(tmp_path / "notify.sqlite"), 5)
+    batcher.register("b1", 7, "confirm")
+    assert not batcher.flush()
+    batcher.register("b1", None, "rem24")
+    assert pending(batcher) == [("b1", 7, "confirm,rem24")]
+
+
+def test_entry_updated_during_post_is_sent_again(tmp_path, monkeypatch):
+    batcher = app.NotifyBatcher(str(tmp_path / "notify.sqlite"), 5)
+    batcher.register("b1", 7)
+    posted = []
+
+    def post(path, payload, headers=None):
+        posted.append(payload["events"])
+        if len(posted) == 1:
+            batcher.register("b1", None, "rem2")  # напоминание ушло, пока пачка была в пути
+
+    monkeypatch.setattr(app, "api_post", post)
+    assert batcher.flush()
+    assert posted[-1] == [{"bookingId": "b1", "chatId": 7, "type": "rem2"}]
+    assert pending(batcher) == []
+
+
+def http_error(status):
+    r = requests.Response()
+    r.status_code = status
+    return requests.HTTPError(f"{status} error", response=r)
+
+
+def test_rejected_batch_is_dropped_but_throttling_is_retried(tmp_path, monkeypatch):
+    batcher = app.NotifyBatcher(str(tmp_path / "notify.sqlite"), 5)
+    batcher.register("b1", 7, "confirm")
+
+    monkeypatch.setattr(app, "api_post", lambda *a, **kw: (_ for _ in ()).throw(http_error(429)))
+    assert not batcher.flush()
+    assert pending(batcher) == [("b1", 7, "confirm")]
+
+    monkeypatch.setattr(app, "api_post", lambda *a, **kw: (_ for _ in ()).throw(http_error(400)))
+    assert batcher.flush()  # не крутится вечно на одной и той же пачке
+    assert pending(batcher) == []
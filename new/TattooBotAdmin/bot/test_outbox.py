@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import bot as app
+
+PAYLOAD = {"clientName": "Аня", "clientPhone": "+79161234567", "serviceId": "s1", "masterId": "m1",
+           "date": "2026-10-20", "time": "12:00"}
+META = {"service": "Тату", "master": "Маша", "when": "20.10 12:00"}
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def http_error(status):
+    r = requests.Response()
+    r.status_code = status
+    return requests.HTTPError(f"{status} error", response=r)
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    bot = FakeBot()
+    monkeypatch.setitem(app.ACTIVE_BOTS, "42", bot)
+    monkeypatch.setattr(app, "safe_get_settings", lambda: {"address": "Москва"})
+    box = app.BookingOutbox(str(tmp_path / "outbox.sqlite"))
+    box.bot = bot
+    return box
+
+
+def status_of(box, key):
+    return box._db.execute("SELECT status, attempts FROM outbox WHERE key=?", (key,)).fetchone()
+
+
+@pytest.mark.parametrize("status", [400, 404, 409])
+def test_client_error_fails_at_once_and_frees_the_user(outbox, monkeypatch, status):
+    calls = []
+
+    def rejected(path, payload, headers=None):
+        calls.append(headers["Idempotency-Key"])
+        raise http_error(status)
+
+    monkeypatch.setattr(app, "api_post", rejected)
+    key = outbox.enqueue(PAYLOAD, chat_id=7, user_id=7, bot="42", meta=META)
+    assert outbox.has_pending(7)
+
+    outbox.drain()
+
+    assert calls == [key]
+    assert status_of(outbox, key) == ("failed", 0)
+    assert not outbox.has_pending(7)  # может сразу выбрать другое время
+    assert outbox.drain() == 0
+    assert "Не удалось подтвердить запись" in outbox.bot.sent[-1][1]
+
+
+@pytest.mark.parametrize("err", [http_error(500), http_error(429), requests.ConnectionError("down")])
+def test_transient_error_is_retried_later(outbox, monkeypatch, err):
+    monkeypatch.setattr(app, "api_post", lambda *a, **kw: (_ for _ in ()).throw(err))
+    key = outbox.enqueue(PAYLOAD, chat_id=7, user_id=7, bot="42", meta=META)
+
+    outbox.drain()
+
+    assert status_of(outbox, key) == ("pending", 1)
+    assert outbox.has_pending(7)
+    assert outbox.drain() == 0  # следующая попытка — после паузы
+    assert outbox.bot.sent == []
+
+
+def test_success_confirms_and_registers_chat(outbox, monkeypatch):
+    registered = []
+    monkeypatch.setattr(app, "api_post", lambda *a, **kw: {"booking": {"id": "b1"}})
+    monkeypatch.setattr(app.DEFAULT_STUDIO.notify, "register", lambda *a: registered.append(a))
+    key = outbox.enqueue(PAYLOAD, chat_id=7, user_id=7, bot="42", meta=META)
+
+    outbox.drain()
+
+    assert status_of(outbox, key) == ("done", 0)
+    assert "Запись подтверждена" in outbox.bot.sent[-1][1]
+    assert registered == [("b1", 7, "confirm")]
+
+
+def test_finalize_uses_current_snapshot_without_refreshing(monkeypatch):
+    svc = app.ServiceRec("s1", "Тату", 60, 5000)
+    monkeypatch.setattr(app.DEFAULT_STUDIO, "catalog", app.Catalog([svc], ts=1.0))  # снимок давно устарел
+    monkeypatch.setattr(app, "get_catalog", lambda: pytest.fail("finalize must not refresh the catalog"))
+    queued = []
+    monkeypatch.setattr(app.OUTBOX, "enqueue", lambda *a: queued.append(a))
+    replies = []
+    update = SimpleNamespace(
+        message=SimpleNamespace(text="+79161234567", reply_text=lambda text, **kw: replies.append(text)),
+        effective_user=SimpleNamespace(id=7, username="anya"), effective_chat=SimpleNamespace(id=7))
+    ctx = SimpleNamespace(bot=SimpleNamespace(token="42:x"), user_data={
+        "customer_name": "Аня", "svc_id": "s1", "date": "2026-10-20", "time": "12:00", "master_id": "m9"})
+
+    assert app.finalize_booking(update, ctx) == app.ConversationHandler.END
+    assert queued[0][4]["service"] == "Тату" and queued[0][4]["master"] == "Любой"
+    assert "Заявка принята" in replies[-1]
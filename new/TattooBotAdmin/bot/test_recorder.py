@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+import bot as app
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    return app.TrafficRecorder(str(tmp_path / "t.jsonl"))
+
+
+@pytest.mark.parametrize("phone", ["89161234567", "+79161234567", "8 (916) 123-45-67"])
+def test_phone_numbers_are_scrubbed(recorder, phone):
+    assert recorder.scrub({"text": phone}) == {"text": "+70000000000"}
+
+
+@pytest.mark.parametrize("text", ["/start", "12", "7"])
+def test_commands_and_captcha_answers_are_kept(recorder, text):
+    assert recorder.scrub({"text": text}) == {"text": text}
+
+
+def test_free_text_and_names_are_replaced(recorder):
+    out = recorder.scrub({"text": "Анна Петрова", "from": {"id": 123456789, "first_name": "Анна"}})
+    assert out["text"] == "Гость" and out["from"]["first_name"] == "x"
+    assert out["from"]["id"] != 123456789
+
+
+def test_tokens_never_reach_the_capture(recorder):
+    token = "123456:AAE-secret"
+    recorder.api("get", "/api/settings", None, {"settings": {"botToken": token, "address": "Москва"}})
+    recorder.api("get", "/api/bot-tokens", {"since": 1}, {"version": 2, "tokens": [token]})
+    recorder._fh.flush()
+    with open(recorder.path, encoding="utf-8") as fh:
+        lines = [json.loads(line) for line in fh]
+    assert [r["p"] for r in lines] == ["/api/settings"]
+    assert lines[0]["d"]["settings"] == {"botToken": "<redacted>", "address": "Москва"}
+    assert token not in json.dumps(lines)
+
+
+def test_captions_and_booking_notes_are_scrubbed(recorder):
+    out = recorder.scrub({"caption": "Анна, +79161234567", "booking": {"notes": "аллергия на латекс"}})
+    assert out == {"caption": "Гость", "booking": {"notes": "x"}}
+
+
+def test_update_keeps_only_allowlisted_fields(recorder):
+    user = {"id": 123456789, "is_bot": False, "first_name": "Анна"}
+    raw = {"update_id": 1, "message": {
+        "message_id": 5, "date": 1760000000, "chat": {"id": 123456789, "type": "private"}, "from": user,
+        "caption": "моё фото", "photo": [{"file_id": "AgAD", "file_unique_id": "u1", "width": 90, "height": 90}],
+        "contact": {"phone_number": "+79161234567", "first_name": "Анна", "user_id": 123456789},
+        "location": {"latitude": 55.75, "longitude": 37.61},
+        "forward_from": user,
+    }}
+    out = recorder.scrub(raw, allowed=app.UPDATE_KEYS)
+    msg = out["message"]
+    assert set(msg) == {"message_id", "date", "chat", "from", "caption", "photo"}
+    assert msg["caption"] == "Гость" and msg["photo"][0]["file_id"] == "<redacted>"
+    # запись по-прежнему собирается в Update: replay и navigate() видят фото
+    update = app.Update.de_json(out, None)
+    assert update.message.photo and update.effective_user.first_name == "x"
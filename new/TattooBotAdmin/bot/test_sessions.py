@@ -0,0 +1,75 @@
+import gc
+import tracemalloc
+from collections import defaultdict
+from types import SimpleNamespace
+
+import bot as app
+
+USERS = 100_000
+
+
+def fake_ctx():
+    dp = SimpleNamespace(user_data=defaultdict(dict), chat_data=defaultdict(dict))
+    return SimpleNamespace(dispatcher=dp)
+
+
+def wave(ctx, first_uid):
+    """USERS новых пользователей проходят запись до шага с телефоном."""
+    for uid in range(first_uid, first_uid + USERS):
+        app.touch_session(SimpleNamespace(effective_user=SimpleNamespace(id=uid)), None)
+        ctx.dispatcher.user_data[uid].update(svc_id="s1", date="2026-10-20", time="12:00", master_id="m1")
+
+
+def test_sessions_are_evicted_after_idle_ttl(monkeypatch):
+    monkeypatch.setattr(app, "_SESSION_SEEN", {})
+    ctx = fake_ctx()
+    wave(ctx, 0)
+    ctx.dispatcher.user_data[-1]["svc_id"] = "s1"  # осталось с прошлого запуска, touch не было
+
+    app.evict_idle_sessions(ctx)  # никто не простаивал
+    assert len(ctx.dispatcher.user_data) == USERS
+
+    monkeypatch.setattr(app, "SESSION_IDLE_TTL", -1)
+    app.evict_idle_sessions(ctx)
+    assert not ctx.dispatcher.user_data and not app._SESSION_SEEN
+
+
+def test_memory_does_not_grow_with_total_users(monkeypatch):
+    monkeypatch.setattr(app, "_SESSION_SEEN", {})
+    monkeypatch.setattr(app, "SESSION_IDLE_TTL", -1)
+    ctx = fake_ctx()
+    tracemalloc.start()
+    try:
+        usage = []
+        for n in range(3):
+            wave(ctx, n * USERS)
+            app.evict_idle_sessions(ctx)
+            gc.collect()
+            usage.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+    # после первой волны память выходит на плато: 300k пользователей стоят как 100k
+    assert usage[2] <= usage[0] * 1.1 + 1_000_000, usage
+
+
+def test_captcha_and_verified_are_capped():
+    verified = app.BoundedLRU(1000)
+    for uid in range(5000):
+        verified.add(uid)
+    assert len(verified) == 1000
+    assert 4999 in verified and 0 not in verified  # старые вытеснены, им снова покажут капчу
+
+    captcha = app.BoundedLRU(10, ttl=600)
+    for uid in range(50):
+        captcha[uid] = (1, 2)
+    assert len(captcha) == 10
+
+
+def test_captcha_expires(monkeypatch):
+    captcha = app.BoundedLRU(10, ttl=600)
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "time", lambda: now[0])
+    captcha[1] = (3, 4)
+    assert captcha.get(1) == (3, 4)
+    now[0] += 601
+    assert captcha.get(1) is None and 1 not in captcha
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+import bot as app
+
+N = 32
+
+
+def run_concurrently(flight, key, fn):
+    """N потоков зовут flight.do(key, fn); upstream отпускаем, когда все уже внутри."""
+    release = threading.Event()
+    entered = threading.Semaphore(0)
+    results, errors = [], []
+
+    def upstream():
+        release.wait(5)
+        return fn()
+
+    def caller():
+        entered.release()
+        try:
+            results.append(flight.do(key, upstream))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(N)]
+    for t in threads:
+        t.start()
+    for _ in threads:
+        entered.acquire()
+    time.sleep(0.2)  # догоняющие успевают встать в ожидание
+    release.set()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"services": [1, 2, 3]}
+
+    results, errors = run_concurrently(app.SingleFlight(), ("/api/services", ()), fetch)
+    assert len(calls) == 1
+    assert not errors and len(results) == N
+    assert all(r is results[0] for r in results)
+
+
+def test_concurrent_callers_share_the_error():
+    calls = []
+    boom = RuntimeError("API down")
+
+    def fetch():
+        calls.append(1)
+        raise boom
+
+    results, errors = run_concurrently(app.SingleFlight(), ("/api/services", ()), fetch)
+    assert len(calls) == 1
+    assert not results and len(errors) == N
+    assert all(e is boom for e in errors)
+
+
+def test_finished_call_is_not_cached():
+    flight = app.SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do("k", lambda: calls.append(1))
+    assert len(calls) == 3
+
+    with pytest.raises(ValueError):
+        flight.do("k", lambda: (_ for _ in ()).throw(ValueError("x")))
+    assert flight.do("k", lambda: 42) == 42  # ошибка не залипает
+
+
+def test_api_get_coalesces_by_path_and_params(monkeypatch):
+    calls = []
+
+    def fake_api_get(path, params=None):
+        calls.append((path, params))
+        return {"ok": True}
+
+    monkeypatch.setattr(app, "_api_get", fake_api_get)
+    flight = app.SingleFlight()
+    monkeypatch.setattr(app, "_API_FLIGHT", flight)
+
+    release = threading.Event()
+    original = flight.do
+    monkeypatch.setattr(flight, "do", lambda key, fn: original(key, lambda: (release.wait(5), fn())[1]))
+
+    threads = [threading.Thread(target=app.api_get, args=("/api/bookings", {"a": 1, "b": 2}))
+               for _ in range(N // 2)]
+    threads += [threading.Thread(target=app.api_get, args=("/api/bookings", {"b": 2, "a": 1}))
+                for _ in range(N // 2)]
+    threads.append(threading.Thread(target=app.api_get, args=("/api/masters",)))
+    for t in threads:
+        t.start()
+    time.sleep(0.2)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert sorted(p for p, _ in calls) == ["/api/bookings", "/api/masters"]
@@ -1,4 +1,6 @@
 import { spawn } from "child_process";
+import fs from "fs";
+import path from "path";
 import { type BotAction } from "@shared/schema";
 
 interface BotCommandResult {
@@ -7,8 +9,36 @@ interface BotCommandResult {
   message?: string;
 }
 
+// Версия набора токенов: бот держит long-poll на /api/bot-tokens и при смене
+// версии перечитывает токены без перезапуска процесса.
+type TokenWaiter = () => void;
+
 class BotManager {
   private queue: Promise<void> = Promise.resolve();
+  private tokenVersion = String(Date.now());
+  private tokenWaiters = new Set<TokenWaiter>();
+
+  get version(): string {
+    return this.tokenVersion;
+  }
+
+  waitForTokenChange(since: string, timeoutMs: number): Promise<void> {
+    if (since !== this.tokenVersion) return Promise.resolve();
+    return new Promise<void>((resolve) => {
+      const done = () => {
+        clearTimeout(timer);
+        this.tokenWaiters.delete(done);
+        resolve();
+      };
+      const timer = setTimeout(done, timeoutMs);
+      this.tokenWaiters.add(done);
+    });
+  }
+
+  private publishTokenChange() {
+    this.tokenVersion = String(Date.now());
+    for (const waiter of Array.from(this.tokenWaiters)) waiter();
+  }
 
   async handleTokenChange(
     previousToken: string | null | undefined,
@@ -22,6 +52,20 @@ class BotManager {
     }
 
     const action: BotAction = next === "" ? "stop" : prev === "" ? "start" : "restart";
+    this.publishTokenChange();
+
+    if (process.env.BOT_HOT_RELOAD === "1") {
+      // restart-скрипт не вызывается, а env-файл бота пишет только он — обновляем
+      // его сами, иначе после рестарта контейнера бот поднимется со старым токеном
+      try {
+        await this.writeEnvFile(next);
+      } catch (error) {
+        const message = error instanceof Error ? error.message : "Не удалось записать env-файл бота";
+        return { triggered: true, action, message: `Токен передан боту, но env-файл не обновлён: ${message}` };
+      }
+      return { triggered: true, action, message: "Токен передан боту без перезапуска" };
+    }
+
     const command = this.resolveCommand(action);
 
     if (!command) {
@@ -41,6 +85,12 @@ class BotManager {
     }
   }
 
+  private async writeEnvFile(token: string) {
+    const file = process.env.BOT_ENV_FILE || "/project/bot-config/bot.env";
+    await fs.promises.mkdir(path.dirname(file), { recursive: true });
+    await fs.promises.writeFile(file, `TELEGRAM_BOT_TOKEN=${token}\n`);
+  }
+
   private resolveCommand(action: BotAction): string | undefined {
     if (action === "stop") {
       return process.env.BOT_STOP_SCRIPT || process.env.BOT_RESTART_SCRIPT;
@@ -140,6 +140,21 @@ export async function runMigrations(db: NodePgDatabase<any>): Promise<void> {
     );
   `);
 
+  await db.execute(sql`
+    CREATE TABLE IF NOT EXISTS booking_notifications (
+      booking_id text PRIMARY KEY,
+      chat_id bigint,
+      confirmation_sent boolean NOT NULL DEFAULT false,
+      rem24h_sent boolean NOT NULL DEFAULT false,
+      rem2h_sent boolean NOT NULL DEFAULT false,
+      updated_at timestamptz NOT NULL DEFAULT now()
+    );
+  `);
+  await db.execute(sql`
+    CREATE INDEX IF NOT EXISTS booking_notifications_chat_id_idx
+    ON booking_notifications (chat_id) WHERE chat_id IS NOT NULL;
+  `);
+
   await addColumnIfMissing(db, "masters", "telegram", '"telegram" text');
   await addColumnIfMissing(db, "masters", "avatar", '"avatar" text');
   await addColumnIfMissing(db, "masters", "teletype_url", '"teletype_url" text');
@@ -168,6 +183,11 @@ export async function runMigrations(db: NodePgDatabase<any>): Promise<void> {
   await db.execute(sql`ALTER TABLE services ALTER COLUMN id SET DEFAULT uuid_generate_v4();`);
   await db.execute(sql`ALTER TABLE bot_messages ALTER COLUMN id SET DEFAULT uuid_generate_v4();`);
   await db.execute(sql`ALTER TABLE bookings ALTER COLUMN id SET DEFAULT uuid_generate_v4();`);
+  await addColumnIfMissing(db, "bookings", "idempotency_key", '"idempotency_key" text');
+  await db.execute(sql`
+    CREATE UNIQUE INDEX IF NOT EXISTS bookings_idempotency_key_idx
+    ON bookings (idempotency_key) WHERE idempotency_key IS NOT NULL;
+  `);
   await db.execute(sql`ALTER TABLE portfolio_items ALTER COLUMN id SET DEFAULT uuid_generate_v4();`);
   await addColumnIfMissing(db, "portfolio_items", "master_id", '"master_id" uuid');
   await addColumnIfMissing(db, "portfolio_items", "style", '"style" text');
@@ -2,45 +2,111 @@
 import type { Router, Request, Response, NextFunction } from "express";
 import fs from "fs";
 import path from "path";
+import { getStorage, type NotificationEvent, type NotificationKind } from "./storage";
 
 // local tiny async wrapper to avoid depending on project's asyncHandler
 const wrap = (fn: (req: Request, res: Response, next: NextFunction) => Promise<any>) =>
   (req: Request, res: Response, next: NextFunction) => fn(req, res, next).catch(next);
 
-// File-backed flags: { [bookingId]: { confirmationSent?: boolean, rem24hSent?: boolean, rem2hSent?: boolean, chatId?: number } }
-const notifFile = path.join(process.cwd(), "data", "notifications.json");
-function readNotif(): any { try { return JSON.parse(fs.readFileSync(notifFile, "utf-8")); } catch { return {}; } }
-function writeNotif(map: any) { fs.mkdirSync(path.dirname(notifFile), { recursive: true }); fs.writeFileSync(notifFile, JSON.stringify(map, null, 2), "utf-8"); }
+// Flags live in the booking_notifications table: { bookingId -> chatId, confirmationSent, rem24hSent, rem2hSent }.
+// The old data/notifications.json is imported once and renamed.
+const legacyFile = path.join(process.cwd(), "data", "notifications.json");
+const KINDS: NotificationKind[] = ["confirm", "rem24", "rem2"];
+const MAX_BATCH = 1000;
+
+let legacyImport: Promise<void> | null = null;
+function importLegacy(): Promise<void> {
+  if (!legacyImport) {
+    legacyImport = (async () => {
+      let map: any;
+      try { map = JSON.parse(fs.readFileSync(legacyFile, "utf-8")); } catch { return; }
+      const events: NotificationEvent[] = [];
+      for (const [bookingId, entry] of Object.entries<any>(map || {})) {
+        const chatId = Number(entry?.chatId);
+        if (Number.isFinite(chatId) && entry?.chatId != null) events.push({ bookingId, chatId });
+        if (entry?.confirmationSent) events.push({ bookingId, type: "confirm" });
+        if (entry?.rem24hSent) events.push({ bookingId, type: "rem24" });
+        if (entry?.rem2hSent) events.push({ bookingId, type: "rem2" });
+      }
+      await getStorage().applyNotificationEvents(events);
+      fs.renameSync(legacyFile, legacyFile + ".imported");
+      console.log(`notifications: imported ${events.length} entries from ${legacyFile}`);
+    })().catch((e) => {
+      legacyImport = null;
+      throw e;
+    });
+  }
+  return legacyImport;
+}
+
+// { bookingId, chatId? , type? } -> event, or an error message
+function parseEvent(raw: any): NotificationEvent | string {
+  const bookingId = String(raw?.bookingId || "");
+  if (!bookingId) return "bookingId required";
+  const ev: NotificationEvent = { bookingId };
+  if (raw.chatId != null) {
+    const chatId = Number(raw.chatId);
+    if (!Number.isSafeInteger(chatId)) return "chatId must be an integer";
+    ev.chatId = chatId;
+  }
+  if (raw.type != null) {
+    if (!KINDS.includes(raw.type)) return `type must be one of ${KINDS.join(", ")}`;
+    ev.type = raw.type;
+  }
+  if (ev.chatId === undefined && ev.type === undefined) return "chatId or type required";
+  return ev;
+}
 
 export function attachNotificationRoutes(api: Router) {
-  // GET /api/notifications — whole map (small)
+  // GET /api/notifications — { [bookingId]: flags }
   api.get("/notifications", wrap(async (_req, res) => {
-    res.json(readNotif());
+    await importLegacy();
+    res.json(await getStorage().listNotifications());
+  }));
+
+  // GET /api/notifications/chats — distinct chat ids, for broadcasts
+  api.get("/notifications/chats", wrap(async (_req, res) => {
+    await importLegacy();
+    res.json({ chats: await getStorage().listNotificationChats() });
+  }));
+
+  // POST /api/notifications/batch { events: [{ bookingId, chatId?, type? }, ...] }
+  api.post("/notifications/batch", wrap(async (req, res) => {
+    const raw = req.body?.events;
+    if (!Array.isArray(raw)) return res.status(400).json({ message: "events array required" });
+    if (raw.length > MAX_BATCH) return res.status(413).json({ message: `at most ${MAX_BATCH} events per batch` });
+    const events: NotificationEvent[] = [];
+    for (const item of raw) {
+      const ev = parseEvent(item);
+      if (typeof ev === "string") return res.status(400).json({ message: ev, event: item });
+      events.push(ev);
+    }
+    await importLegacy();
+    const bookings = await getStorage().applyNotificationEvents(events);
+    res.json({ ok: true, bookings });
   }));
 
   // POST /api/notifications/register-chat { bookingId, chatId }
   api.post("/notifications/register-chat", wrap(async (req, res) => {
-    const id = String((req.body?.bookingId) || "");
-    const chatId = (req.body?.chatId);
-    if (!id || !chatId) return res.status(400).json({ message: "bookingId and chatId required" });
-    const map = readNotif();
-    map[id] = { ...(map[id] || {}), chatId };
-    writeNotif(map);
+    if (!req.body?.bookingId || req.body?.chatId == null) {
+      return res.status(400).json({ message: "bookingId and chatId required" });
+    }
+    const ev = parseEvent({ bookingId: req.body.bookingId, chatId: req.body.chatId });
+    if (typeof ev === "string") return res.status(400).json({ message: ev });
+    await importLegacy();
+    await getStorage().applyNotificationEvents([ev]);
     res.json({ ok: true });
   }));
 
   // POST /api/notifications/mark { bookingId, type: "confirm"|"rem24"|"rem2" }
   api.post("/notifications/mark", wrap(async (req, res) => {
-    const id = String((req.body?.bookingId) || "");
-    const kind = String((req.body?.type) || "");
-    if (!id || !kind) return res.status(400).json({ message: "bookingId and type required" });
-    const map = readNotif();
-    const cur = map[id] || {};
-    if (kind === "confirm") cur.confirmationSent = true;
-    if (kind === "rem24") cur.rem24hSent = true;
-    if (kind === "rem2") cur.rem2hSent = true;
-    map[id] = cur;
-    writeNotif(map);
+    if (!req.body?.bookingId || !req.body?.type) {
+      return res.status(400).json({ message: "bookingId and type required" });
+    }
+    const ev = parseEvent({ bookingId: req.body.bookingId, type: req.body.type });
+    if (typeof ev === "string") return res.status(400).json({ message: ev });
+    await importLegacy();
+    await getStorage().applyNotificationEvents([ev]);
     res.json({ ok: true });
   }));
 }
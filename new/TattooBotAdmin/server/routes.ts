@@ -155,9 +155,31 @@ export async function registerRoutes(app: Express): Promise<Server> {
   api.post(
     "/bookings",
     asyncHandler(async (req, res) => {
-      const payload = insertBookingSchema.parse(req.body);
-      const booking = await storage.createBooking(payload);
-      res.status(201).json({ booking });
+      const parsed = insertBookingSchema.safeParse(req.body);
+      if (!parsed.success) {
+        return res.status(400).json({ message: "Некорректные данные записи", issues: parsed.error.issues });
+      }
+      // повтор запроса с тем же ключом (бот ретраит из outbox) не создаёт дубль
+      const idempotencyKey = String(req.get("Idempotency-Key") || req.body?.idempotencyKey || "").trim() || undefined;
+      if (idempotencyKey) {
+        const existing = await storage.findBookingByIdempotencyKey(idempotencyKey);
+        if (existing) return res.status(200).json({ booking: existing, replayed: true });
+      }
+      // ошибки клиента отдаём 4xx: клиенты с ретраями (outbox бота) не должны их повторять
+      try {
+        const booking = await storage.createBooking(parsed.data, idempotencyKey);
+        res.status(201).json({ booking });
+      } catch (error: any) {
+        const message = error instanceof Error ? error.message : String(error);
+        if (error instanceof z.ZodError) {
+          return res.status(400).json({ message: "Некорректные данные записи", issues: error.issues });
+        }
+        if (/занято/i.test(message)) return res.status(409).json({ message });
+        if (/Service not found/i.test(message)) return res.status(404).json({ message: "Услуга не найдена" });
+        // 23503: foreign key — мастер или услуга не существуют
+        if (error?.code === "23503") return res.status(400).json({ message: "Мастер или услуга не найдены" });
+        throw error;
+      }
     }),
   );
 
@@ -216,6 +238,36 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }),
   );
 
+  // GET /api/availability/range?masterId=any|<uuid>&duration=60&from=YYYY-MM-DD&to=YYYY-MM-DD[&open=10:00&close=20:00&step=60]
+  api.get(
+    "/availability/range",
+    asyncHandler(async (req, res) => {
+      const day = z.string().regex(/^\d{4}-\d{2}-\d{2}$/);
+      const clock = z.string().regex(/^\d{2}:\d{2}$/);
+      const params = z
+        .object({
+          masterId: z.union([z.literal("any"), z.string().uuid()]).default("any"),
+          duration: z.coerce.number().int().min(5).max(720),
+          from: day,
+          to: day,
+          open: clock.optional(),
+          close: clock.optional(),
+          step: z.coerce.number().int().min(5).max(720).optional(),
+        })
+        .parse(req.query);
+      const span = (Date.parse(params.to) - Date.parse(params.from)) / 86_400_000;
+      if (!(span >= 0 && span < 62)) {
+        return res.status(400).json({ message: "from..to must cover 1 to 62 days" });
+      }
+      const days = await storage.getAvailabilityRange(params.masterId, params.duration, params.from, params.to, {
+        open: params.open,
+        close: params.close,
+        step: params.step,
+      });
+      res.json({ days });
+    }),
+  );
+
   api.get(
     "/messages",
     asyncHandler(async (_req, res) => {
@@ -273,6 +325,19 @@ export async function registerRoutes(app: Express): Promise<Server> {
     }),
   );
 
+  // GET /api/bot-tokens?since=<version>&wait=<sec> — long-poll для горячей смены токена
+  api.get(
+    "/bot-tokens",
+    asyncHandler(async (req, res) => {
+      const since = String(req.query.since ?? "");
+      const wait = Math.min(Math.max(Number(req.query.wait) || 0, 0), 30);
+      await botManager.waitForTokenChange(since, wait * 1000);
+      const settings = await storage.getSettings();
+      const tokens = settings.botToken ? [settings.botToken] : [];
+      res.json({ version: botManager.version, tokens });
+    }),
+  );
+
   api.use("/portfolio", portfolioRouter);
   api.use("/bot", botRouter);
 
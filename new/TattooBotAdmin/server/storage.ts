@@ -1,6 +1,7 @@
 import { randomUUID } from "crypto";
-import { and, asc, desc, eq, gte, ne, sql } from "drizzle-orm";
+import { and, asc, desc, eq, gte, lte, ne, sql } from "drizzle-orm";
 import {
+  bookingNotificationsTable,
   bookingSchema,
   bookingStatusSchema,
   bookingsTable,
@@ -43,6 +44,15 @@ function normalizeUploadUrl(u: string | null | undefined): string {
   return url;
 }
 
+export type NotificationKind = "confirm" | "rem24" | "rem2";
+export type NotificationEvent = { bookingId: string; chatId?: number; type?: NotificationKind };
+export type NotificationFlags = {
+  chatId?: number;
+  confirmationSent?: boolean;
+  rem24hSent?: boolean;
+  rem2hSent?: boolean;
+};
+
 function optional<T>(value: T | null): T | undefined {
   return value === null ? undefined : value;
 }
@@ -184,6 +194,24 @@ function formatSlot(date: string, time: string, duration: number) {
   return { start, end };
 }
 
+export type AvailabilityDay = { date: string; slots: { time: string; masterIds: string[] }[] };
+export type WorkingHours = { open?: string; close?: string; step?: number };
+
+function toMinutes(time: string): number {
+  const [hours, minutes] = time.split(":").map((v) => parseInt(v, 10));
+  return hours * 60 + minutes;
+}
+
+function fromMinutes(total: number): string {
+  return `${Math.floor(total / 60).toString().padStart(2, "0")}:${(total % 60).toString().padStart(2, "0")}`;
+}
+
+function addDays(date: string, days: number): string {
+  const d = new Date(`${date}T00:00:00Z`);
+  d.setUTCDate(d.getUTCDate() + days);
+  return d.toISOString().slice(0, 10);
+}
+
 interface BookingRow {
   id: string;
   clientName: string;
@@ -561,8 +589,23 @@ export class DatabaseStorage {
     return rows.map((row) => this.normalizeBooking(row));
   }
 
-  async createBooking(input: InsertBooking): Promise<Booking> {
+  async findBookingByIdempotencyKey(key: string): Promise<Booking | undefined> {
+    await this.ensureReady();
+    const rows = await this.database
+      .select({ id: bookingsTable.id })
+      .from(bookingsTable)
+      .where(eq(bookingsTable.idempotencyKey, key))
+      .limit(1);
+    if (rows.length === 0) return undefined;
+    return this.getBookingById(rows[0].id);
+  }
+
+  async createBooking(input: InsertBooking, idempotencyKey?: string): Promise<Booking> {
     await this.ensureReady();
+    if (idempotencyKey) {
+      const existing = await this.findBookingByIdempotencyKey(idempotencyKey);
+      if (existing) return existing;
+    }
     const payload = insertBookingSchema.parse({ ...input, status: input.status ?? "pending" });
 
     const serviceRows = await this.database
@@ -579,19 +622,29 @@ export class DatabaseStorage {
 
     const bookingId = randomUUID();
 
-    await this.database.insert(bookingsTable).values({
-      id: bookingId,
-      clientName: payload.clientName,
-      clientPhone: payload.clientPhone,
-      clientTelegram: payload.clientTelegram ?? null,
-      masterId: payload.masterId,
-      serviceId: payload.serviceId,
-      date: payload.date,
-      time: payload.time,
-      duration,
-      status: (payload.status ?? "pending") as Booking["status"],
-      notes: payload.notes ?? null,
-    });
+    try {
+      await this.database.insert(bookingsTable).values({
+        id: bookingId,
+        clientName: payload.clientName,
+        clientPhone: payload.clientPhone,
+        clientTelegram: payload.clientTelegram ?? null,
+        masterId: payload.masterId,
+        serviceId: payload.serviceId,
+        date: payload.date,
+        time: payload.time,
+        duration,
+        status: (payload.status ?? "pending") as Booking["status"],
+        notes: payload.notes ?? null,
+        idempotencyKey: idempotencyKey ?? null,
+      });
+    } catch (e: any) {
+      // параллельный повтор с тем же ключом успел вставить запись первым
+      if (idempotencyKey && e?.code === "23505") {
+        const existing = await this.findBookingByIdempotencyKey(idempotencyKey);
+        if (existing) return existing;
+      }
+      throw e;
+    }
 
     const booking = await this.getBookingById(bookingId);
     if (!booking) throw new Error("Failed to create booking");
@@ -900,43 +953,148 @@ export class DatabaseStorage {
     };
   }
 
+  async listNotifications(): Promise<Record<string, NotificationFlags>> {
+    await this.ensureReady();
+    const rows = await this.database.select().from(bookingNotificationsTable);
+    const map: Record<string, NotificationFlags> = {};
+    for (const row of rows) {
+      const entry: NotificationFlags = {};
+      if (row.chatId !== null) entry.chatId = row.chatId;
+      if (row.confirmationSent) entry.confirmationSent = true;
+      if (row.rem24hSent) entry.rem24hSent = true;
+      if (row.rem2hSent) entry.rem2hSent = true;
+      map[row.bookingId] = entry;
+    }
+    return map;
+  }
+
+  async listNotificationChats(): Promise<number[]> {
+    await this.ensureReady();
+    const rows = await this.database
+      .selectDistinct({ chatId: bookingNotificationsTable.chatId })
+      .from(bookingNotificationsTable)
+      .where(sql`${bookingNotificationsTable.chatId} IS NOT NULL`);
+    return rows.map((row) => row.chatId as number);
+  }
+
+  // Все события пачки сворачиваются в одну строку на бронь и пишутся одним
+  // upsert-ом; флаги только включаются, поэтому параллельные пачки не теряют друг друга.
+  async applyNotificationEvents(events: NotificationEvent[]): Promise<number> {
+    await this.ensureReady();
+    const merged = new Map<string, typeof bookingNotificationsTable.$inferInsert>();
+    for (const ev of events) {
+      const row = merged.get(ev.bookingId) ?? {
+        bookingId: ev.bookingId,
+        chatId: null,
+        confirmationSent: false,
+        rem24hSent: false,
+        rem2hSent: false,
+      };
+      if (ev.chatId !== undefined) row.chatId = ev.chatId;
+      if (ev.type === "confirm") row.confirmationSent = true;
+      if (ev.type === "rem24") row.rem24hSent = true;
+      if (ev.type === "rem2") row.rem2hSent = true;
+      merged.set(ev.bookingId, row);
+    }
+    if (merged.size === 0) return 0;
+
+    const t = bookingNotificationsTable;
+    await this.database
+      .insert(t)
+      .values(Array.from(merged.values()))
+      .onConflictDoUpdate({
+        target: t.bookingId,
+        set: {
+          chatId: sql`coalesce(excluded.chat_id, ${t.chatId})`,
+          confirmationSent: sql`${t.confirmationSent} OR excluded.confirmation_sent`,
+          rem24hSent: sql`${t.rem24hSent} OR excluded.rem24h_sent`,
+          rem2hSent: sql`${t.rem2hSent} OR excluded.rem2h_sent`,
+          updatedAt: sql`now()`,
+        },
+      });
+    return merged.size;
+  }
+
   async getAvailableSlots(masterId: string, date: string, duration: number): Promise<string[]> {
+    const [day] = await this.getAvailabilityRange(masterId, duration, date, date);
+    return day ? day.slots.map((slot) => slot.time) : [];
+  }
+
+  // Свободные старты для мастера (или "any" — любого активного) на каждый день
+  // диапазона. Записи берутся одним запросом, отсортированными; на каждый
+  // день/мастера они сливаются в непересекающиеся интервалы, и сетка слотов
+  // проходится по ним одним указателем: O(слоты + записи) вместо их произведения.
+  async getAvailabilityRange(
+    masterId: string,
+    duration: number,
+    from: string,
+    to: string,
+    hours: WorkingHours = {},
+  ): Promise<AvailabilityDay[]> {
     await this.ensureReady();
-    const openingHour = 10;
-    const closingHour = 22;
-    const stepMinutes = 30;
-    const slots: string[] = [];
+    const open = toMinutes(hours.open ?? "10:00");
+    const close = toMinutes(hours.close ?? "22:00");
+    const step = hours.step ?? 30;
+
+    const anyMaster = masterId === "any";
+    const masterIds = anyMaster
+      ? (await this.database
+          .select({ id: mastersTable.id })
+          .from(mastersTable)
+          .where(eq(mastersTable.isActive, true))
+          .orderBy(asc(mastersTable.name))).map((row) => row.id)
+      : [masterId];
 
-    const existing = await this.database
-      .select({ time: bookingsTable.time, duration: bookingsTable.duration })
+    const conditions = [
+      gte(bookingsTable.date, from),
+      lte(bookingsTable.date, to),
+      ne(bookingsTable.status, "cancelled"),
+    ];
+    if (!anyMaster) conditions.push(eq(bookingsTable.masterId, masterId));
+
+    const rows = await this.database
+      .select({
+        masterId: bookingsTable.masterId,
+        date: bookingsTable.date,
+        time: bookingsTable.time,
+        duration: bookingsTable.duration,
+      })
       .from(bookingsTable)
-      .where(and(eq(bookingsTable.masterId, masterId), eq(bookingsTable.date, date), ne(bookingsTable.status, "cancelled")));
-
-    for (let hour = openingHour; hour <= closingHour; hour++) {
-      for (let minute = 0; minute < 60; minute += stepMinutes) {
-        const time = `${hour.toString().padStart(2, "0")}:${minute.toString().padStart(2, "0")}`;
-        const slotToInsert = formatSlot(date, time, duration);
-        if (
-          slotToInsert.end.getHours() > closingHour ||
-          (slotToInsert.end.getHours() === closingHour && slotToInsert.end.getMinutes() > 0)
-        ) {
-          continue;
-        }
-
-        const available = existing.every((booking) => {
-          const slot = formatSlot(
-            date,
-            booking.time.length > 5 ? booking.time.slice(0, 5) : booking.time,
-            booking.duration,
-          );
-          return slotToInsert.end <= slot.start || slotToInsert.start >= slot.end;
-        });
+      .where(and(...conditions))
+      .orderBy(asc(bookingsTable.date), asc(bookingsTable.masterId), asc(bookingsTable.time));
 
-        if (available) slots.push(time);
-      }
+    // `${date}|${masterId}` -> занятые [start, end) в минутах, по возрастанию и без пересечений
+    const busy = new Map<string, Array<[number, number]>>();
+    for (const row of rows) {
+      const key = `${row.date}|${row.masterId}`;
+      const start = toMinutes(row.time);
+      const end = start + row.duration;
+      const list = busy.get(key);
+      const last = list?.[list.length - 1];
+      if (!list) busy.set(key, [[start, end]]);
+      else if (last && start <= last[1]) last[1] = Math.max(last[1], end);
+      else list.push([start, end]);
     }
 
-    return slots;
+    const starts: number[] = [];
+    for (let t = open; t + duration <= close; t += step) starts.push(t);
+
+    const days: AvailabilityDay[] = [];
+    for (let day = from; day <= to; day = addDays(day, 1)) {
+      const free: string[][] = starts.map(() => []);
+      for (const id of masterIds) {
+        const intervals = busy.get(`${day}|${id}`) ?? [];
+        let i = 0;
+        starts.forEach((start, k) => {
+          while (i < intervals.length && intervals[i][1] <= start) i++;
+          if (i === intervals.length || intervals[i][0] >= start + duration) free[k].push(id);
+        });
+      }
+      const slots = starts.flatMap((start, k) =>
+        free[k].length > 0 ? [{ time: fromMinutes(start), masterIds: free[k] }] : []);
+      days.push({ date: day, slots });
+    }
+    return days;
   }
 }
 
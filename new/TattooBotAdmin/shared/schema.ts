@@ -1,6 +1,6 @@
 import { sql } from "drizzle-orm";
 import {
-  boolean, date, integer, pgTable, text, time, timestamp, uuid, varchar,
+  bigint, boolean, date, integer, pgTable, text, time, timestamp, uuid, varchar,
 } from "drizzle-orm/pg-core";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
@@ -46,9 +46,20 @@ export const bookingsTable = pgTable("bookings", {
   duration: integer("duration").notNull(),
   status: text("status").notNull(),
   notes: text("notes"),
+  idempotencyKey: text("idempotency_key"),
   createdAt: timestamp("created_at", { withTimezone: true }).notNull().default(sql`now()`),
 });
 
+/** BOOKING NOTIFICATIONS (chat to notify + which messages were already sent) */
+export const bookingNotificationsTable = pgTable("booking_notifications", {
+  bookingId: text("booking_id").primaryKey(),
+  chatId: bigint("chat_id", { mode: "number" }),
+  confirmationSent: boolean("confirmation_sent").notNull().default(false),
+  rem24hSent: boolean("rem24h_sent").notNull().default(false),
+  rem2hSent: boolean("rem2h_sent").notNull().default(false),
+  updatedAt: timestamp("updated_at", { withTimezone: true }).notNull().default(sql`now()`),
+});
+
 /** BOT MESSAGES */
 export const botMessagesTable = pgTable("bot_messages", {
   id: uuid("id").primaryKey().default(sql`gen_random_uuid()`),